@@ -4,16 +4,158 @@ MCP Server for File Management
 Provides file and directory operations with safety controls
 """
 
+import asyncio
+import inspect
 import json
 import sys
 import os
 import shutil
-import glob
+import fnmatch
+import functools
+import re
 import hashlib
+import io
 import mimetypes
+import select
+import subprocess
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from stat import S_ISDIR
+from typing import Dict, List, Any, Optional, Union, Iterator, Tuple, Callable, Set
 import base64
+import errno
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    def _json_loads(data):
+        return orjson.loads(data)
+    
+    def _json_dumps(obj) -> bytes:
+        """Compact JSON for the RPC envelope"""
+        return orjson.dumps(obj)
+    
+    def _json_dumps_pretty(obj) -> str:
+        """Indented JSON for tool output"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+else:
+    def _json_loads(data):
+        return json.loads(data)
+    
+    def _json_dumps(obj) -> bytes:
+        """Compact JSON for the RPC envelope"""
+        return json.dumps(obj).encode()
+    
+    def _json_dumps_pretty(obj) -> str:
+        """Indented JSON for tool output"""
+        return json.dumps(obj, indent=2)
+
+if msgspec is not None:
+    class RPCRequest(msgspec.Struct):
+        """JSON-RPC request envelope; fields are checked in dispatch, as with plain json"""
+        jsonrpc: Any = "2.0"
+        id: Any = None
+        method: Any = None
+        params: Any = None
+    
+    _request_decoder = msgspec.json.Decoder(RPCRequest)
+    # ValidationError subclasses DecodeError; with untyped fields it only means "not an object"
+    RequestDecodeError = msgspec.DecodeError
+    RequestInvalidError = msgspec.ValidationError
+    
+    def _decode_request(line: bytes) -> Tuple[Optional[str], Any, Dict]:
+        """Decode a request line into (method, id, params)"""
+        request = _request_decoder.decode(line)
+        return request.method, request.id, request.params or {}
+else:
+    RequestDecodeError = json.JSONDecodeError
+    
+    class RequestInvalidError(ValueError):
+        """Valid JSON that is not a request object"""
+    
+    def _decode_request(line: bytes) -> Tuple[Optional[str], Any, Dict]:
+        """Decode a request line into (method, id, params)"""
+        request = _json_loads(line)
+        if not isinstance(request, dict):
+            raise RequestInvalidError("Expected a JSON object")
+        return request.get("method"), request.get("id"), request.get("params") or {}
+
+# Resolved once at import; search_files falls back to a pure-Python scan without it
+RG_PATH = shutil.which("rg")
+
+# Binary reads are base64-encoded in 57 KiB slices; a multiple of 3 leaves no padding mid-stream
+BASE64_CHUNK_SIZE = 57 * 1024
+MAX_BINARY_READ_SIZE = 50 * 1024 * 1024  # 50MB
+
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# MIME top-level types read_file returns base64-encoded
+BINARY_MIME_TOPS = frozenset({"image", "audio", "video"})
+
+def _is_binary_mime(mime_type: Optional[str]) -> bool:
+    """Check whether read_file should treat a MIME type as binary"""
+    if not mime_type:
+        return False
+    return mime_type == "application/octet-stream" or mime_type.split("/", 1)[0] in BINARY_MIME_TOPS
+
+# Directory listings are reused while the directory's mtime is unchanged
+DIR_CACHE_SIZE = 4096
+# Listings of directories modified more recently than this are not cached,
+# since a change within the same timestamp tick would go unnoticed
+DIR_CACHE_MIN_AGE_NS = 2 * 1_000_000_000
+
+# System locations that tools may not touch
+RESTRICTED_ROOTS = ('/etc', '/sys', '/proc', 'C:\\Windows', 'C:\\Program Files')
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_path(file_path: str) -> str:
+    """Expand ~ and make a path absolute (string-only, safe to cache)"""
+    return os.path.abspath(os.path.expanduser(file_path))
+
+# Marker for a "**" segment in a compiled pattern
+GLOBSTAR = None
+
+# Windows file names are case-insensitive, and glob matched them that way
+CASE_INSENSITIVE_NAMES = os.name == "nt"
+
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern: str, recursive: bool) -> Tuple[Optional[Callable[[str], bool]], ...]:
+    """Split a glob pattern into per-directory segment matchers; like glob, "**" only spans directories when recursive"""
+    segments = []
+    for part in pattern.replace(os.sep, "/").split("/"):
+        if not part:
+            continue
+        if part == "**" and recursive:
+            if segments and segments[-1] is GLOBSTAR:
+                continue
+            segments.append(GLOBSTAR)
+        elif not _has_magic(part):
+            if CASE_INSENSITIVE_NAMES:
+                segments.append(lambda name, part=part.lower(): name.lower() == part)
+            else:
+                segments.append(part.__eq__)
+        else:
+            match = re.compile(fnmatch.translate(part), re.IGNORECASE if CASE_INSENSITIVE_NAMES else 0).match
+            if part.startswith("."):
+                segments.append(lambda name, match=match: match(name) is not None)
+            else:
+                # Like glob, wildcards never match dotfiles
+                segments.append(lambda name, match=match: not name.startswith(".") and match(name) is not None)
+    return tuple(segments)
+
+def _has_magic(segment: str) -> bool:
+    """Check whether a pattern segment contains wildcard characters"""
+    return any(c in segment for c in "*?[")
 
 class MCPFileServer:
     def __init__(self):
@@ -201,18 +343,62 @@ class MCPFileServer:
         
         # Set safe working directory
         self.safe_root = os.path.expanduser("~")
+        
+        # Files at or above this size are not hashed by get_file_info
+        self.hash_size_limit = int(os.environ.get("MCP_HASH_LIMIT", 100 * 1024 * 1024))  # 100MB
+        
+        # Restricted roots in both spelled and symlink-resolved form (e.g. /etc -> /private/etc)
+        denied = set()
+        for root in RESTRICTED_ROOTS:
+            denied.add(os.path.normcase(root))
+            if os.path.isabs(root):
+                denied.add(os.path.normcase(os.path.realpath(root)))
+        self._denied = frozenset(denied)
+        self._denied_prefixes = tuple(root.rstrip(os.sep) + os.sep for root in denied)
+        
+        # Dispatch tables, built once rather than per request
+        self._handlers = {
+            "initialize": self.handle_initialize,
+            "tools/list": self.handle_list_tools,
+            "tools/call": self.handle_call_tool,
+        }
+        self._tool_handlers = {
+            "read_file": self.read_file,
+            "write_file": self.write_file,
+            "list_files": self.list_files,
+            "create_directory": self.create_directory,
+            "delete_file": self.delete_file,
+            "move_file": self.move_file,
+            "copy_file": self.copy_file,
+            "get_file_info": self.get_file_info,
+            "search_files": self.search_files
+        }
+        
+        # The tool list is static, so build it (and its JSON) once
+        tools_list = []
+        for name, tool in self.tools.items():
+            tools_list.append({
+                "name": name,
+                "description": tool["description"],
+                "inputSchema": tool["inputSchema"]
+            })
+        self._tools_list_result = {"tools": tools_list}
+        self._tools_list_json = _json_dumps(self._tools_list_result)
+        
+        # Absolute directory path -> (mtime_ns, [(name, is_dir, is_symlink)])
+        self._dir_cache: "OrderedDict[str, Tuple[int, List[Tuple[str, bool, bool]]]]" = OrderedDict()
     
     def is_safe_path(self, file_path: str) -> bool:
         """Check if path is safe to access"""
         try:
-            # Resolve to absolute path
-            abs_path = os.path.abspath(os.path.expanduser(file_path))
+            # Resolve symlinks every time, so a link into a restricted root is caught
+            real_path = os.path.normcase(os.path.realpath(_normalize_path(file_path)))
             # Check if it's within safe boundaries
-            return not abs_path.startswith(('/etc', '/sys', '/proc', 'C:\\Windows', 'C:\\Program Files'))
+            return real_path not in self._denied and not real_path.startswith(self._denied_prefixes)
         except:
             return False
     
-    def handle_initialize(self, request: Dict) -> Dict:
+    def handle_initialize(self, params: Dict) -> Dict:
         """Handle initialization request"""
         return {
             "protocolVersion": "2024-11-05",
@@ -226,37 +412,21 @@ class MCPFileServer:
             }
         }
     
-    def handle_list_tools(self, request: Dict) -> Dict:
+    def handle_list_tools(self, params: Dict) -> Dict:
         """List available tools"""
-        tools_list = []
-        for name, tool in self.tools.items():
-            tools_list.append({
-                "name": name,
-                "description": tool["description"],
-                "inputSchema": tool["inputSchema"]
-            })
-        return {"tools": tools_list}
+        return self._tools_list_result
     
-    def handle_call_tool(self, request: Dict) -> Dict:
+    async def handle_call_tool(self, params: Dict) -> Dict:
         """Execute a tool"""
-        tool_name = request.get("params", {}).get("name")
-        arguments = request.get("params", {}).get("arguments", {})
+        tool_name = params.get("name")
+        arguments = params.get("arguments", {})
         
-        tool_handlers = {
-            "read_file": self.read_file,
-            "write_file": self.write_file,
-            "list_files": self.list_files,
-            "create_directory": self.create_directory,
-            "delete_file": self.delete_file,
-            "move_file": self.move_file,
-            "copy_file": self.copy_file,
-            "get_file_info": self.get_file_info,
-            "search_files": self.search_files
-        }
-        
-        handler = tool_handlers.get(tool_name)
+        handler = self._tool_handlers.get(tool_name)
         if handler:
-            return handler(arguments)
+            result = handler(arguments)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
         else:
             return {
                 "error": {
@@ -282,10 +452,24 @@ class MCPFileServer:
             # Check if file is binary
             mime_type, _ = mimetypes.guess_type(file_path)
             
-            if mime_type and mime_type.startswith(('image/', 'audio/', 'video/', 'application/octet-stream')):
-                # Read as binary and encode to base64
+            if _is_binary_mime(mime_type):
+                size = os.path.getsize(file_path)
+                if size > MAX_BINARY_READ_SIZE:
+                    return {
+                        "content": [{
+                            "type": "text",
+                            "text": f"Error: Binary file too large to read ({self._human_readable_size(size)}, "
+                                    f"limit {self._human_readable_size(MAX_BINARY_READ_SIZE)})"
+                        }]
+                    }
+                
+                # Read and encode to base64 slice by slice. Buffered reads, not mmap: a file
+                # truncated while mapped raises SIGBUS and would take the whole server down
+                encoded = bytearray()
                 with open(file_path, 'rb') as f:
-                    content = base64.b64encode(f.read()).decode('ascii')
+                    for chunk in iter(functools.partial(f.read, BASE64_CHUNK_SIZE), b''):
+                        encoded += base64.b64encode(chunk)
+                content = encoded.decode('ascii')
                 return {
                     "content": [{
                         "type": "text",
@@ -360,29 +544,19 @@ class MCPFileServer:
             }
         
         try:
-            if recursive:
-                search_pattern = os.path.join(directory, "**", pattern)
-                files = glob.glob(search_pattern, recursive=True)
-            else:
-                search_pattern = os.path.join(directory, pattern)
-                files = glob.glob(search_pattern)
-            
-            # Get file details
             file_list = []
-            for file_path in files:
-                if os.path.exists(file_path):
-                    stat = os.stat(file_path)
-                    file_list.append({
-                        "path": file_path,
-                        "type": "dir" if os.path.isdir(file_path) else "file",
-                        "size": stat.st_size,
-                        "modified": stat.st_mtime
-                    })
+            for file_path, stat, is_dir in self._walk(directory, pattern, recursive):
+                file_list.append({
+                    "path": file_path,
+                    "type": "dir" if is_dir else "file",
+                    "size": stat.st_size,
+                    "modified": stat.st_mtime
+                })
             
             return {
                 "content": [{
                     "type": "text",
-                    "text": json.dumps(file_list, indent=2)
+                    "text": _json_dumps_pretty(file_list)
                 }]
             }
         except Exception as e:
@@ -472,7 +646,17 @@ class MCPFileServer:
             }
         
         try:
-            shutil.move(source, destination)
+            if os.path.isdir(destination):
+                # shutil.move places the source inside an existing directory
+                shutil.move(source, destination)
+            else:
+                try:
+                    # Same filesystem: a single atomic rename
+                    os.replace(source, destination)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.move(source, destination)
             return {
                 "content": [{
                     "type": "text",
@@ -513,7 +697,7 @@ class MCPFileServer:
                         }]
                     }
             else:
-                shutil.copy2(source, destination)
+                self._copy_file(source, destination)
             
             return {
                 "content": [{
@@ -529,7 +713,7 @@ class MCPFileServer:
                 }]
             }
     
-    def get_file_info(self, args: Dict) -> Dict:
+    async def get_file_info(self, args: Dict) -> Dict:
         """Get detailed file information"""
         file_path = args.get("path", "")
         
@@ -572,15 +756,14 @@ class MCPFileServer:
                 mime_type, _ = mimetypes.guess_type(file_path)
                 info["mime_type"] = mime_type
                 
-                # Calculate hash for small files
-                if stat.st_size < 100 * 1024 * 1024:  # 100MB limit
-                    with open(file_path, 'rb') as f:
-                        info["md5"] = hashlib.md5(f.read()).hexdigest()
+                # Calculate hash for small files, off the event loop so other requests are served meanwhile
+                if stat.st_size < self.hash_size_limit:
+                    info["blake2b"] = await asyncio.to_thread(self._hash_file, file_path)
             
             return {
                 "content": [{
                     "type": "text",
-                    "text": json.dumps(info, indent=2)
+                    "text": _json_dumps_pretty(info)
                 }]
             }
         except Exception as e:
@@ -606,37 +789,15 @@ class MCPFileServer:
             }
         
         try:
-            results = []
-            search_path = os.path.join(directory, "**", file_pattern)
-            
-            for file_path in glob.glob(search_path, recursive=True):
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            if search_pattern.lower() in content.lower():
-                                # Find line numbers
-                                lines = content.split('\n')
-                                matching_lines = []
-                                for i, line in enumerate(lines, 1):
-                                    if search_pattern.lower() in line.lower():
-                                        matching_lines.append({
-                                            "line_number": i,
-                                            "content": line.strip()[:100]  # First 100 chars
-                                        })
-                                
-                                results.append({
-                                    "file": file_path,
-                                    "matches": matching_lines[:5]  # Limit to first 5 matches
-                                })
-                    except:
-                        # Skip files that can't be read as text
-                        pass
+            if RG_PATH:
+                results = self._search_files_rg(directory, search_pattern, file_pattern)
+            else:
+                results = self._search_files_python(directory, search_pattern, file_pattern)
             
             return {
                 "content": [{
                     "type": "text",
-                    "text": json.dumps(results, indent=2) if results else "No matches found"
+                    "text": _json_dumps_pretty(results) if results else "No matches found"
                 }]
             }
         except Exception as e:
@@ -647,37 +808,301 @@ class MCPFileServer:
                 }]
             }
     
+    def _search_files_rg(self, directory: str, search_pattern: str, file_pattern: str) -> List[Dict]:
+        """Search using ripgrep's JSON output"""
+        segments = file_pattern.replace(os.sep, "/").split("/")
+        # rg anchors a glob with a separator to the search root; glob matched it at any depth
+        rg_glob = "**/" + "/".join(segments) if len(segments) > 1 else file_pattern
+        cmd = [
+            RG_PATH, "--json", "-n", "-i", "-F",
+            "--no-ignore", "--max-count", "5",
+            "--glob", rg_glob,
+        ]
+        if not any(segment.startswith(".") for segment in segments):
+            # Match glob.glob, which skips dotfiles unless asked for them
+            cmd += ["--glob", "!.*"]
+        # rg matches globs against paths relative to its working directory, so search from
+        # the directory itself; stdin is the RPC stream and must not reach rg
+        if not os.path.isdir(directory):
+            return []
+        cmd += ["--", search_pattern, "."]
+        proc = subprocess.run(cmd, cwd=directory, stdin=subprocess.DEVNULL, capture_output=True)
+        
+        matches_by_file: Dict[str, List[Dict]] = {}
+        for raw in proc.stdout.splitlines():
+            event = _json_loads(raw)
+            if event.get("type") != "match":
+                continue
+            data = event["data"]
+            path = data["path"].get("text")
+            line = data["lines"].get("text")
+            if path is None or line is None:
+                # Non-UTF-8 path or line, reported base64-encoded by rg
+                continue
+            path = os.path.join(directory, os.path.normpath(path))
+            matches_by_file.setdefault(path, []).append({
+                "line_number": data["line_number"],
+                "content": line.strip()[:100]  # First 100 chars
+            })
+        
+        return [
+            {"file": path, "matches": matches[:5]}
+            for path, matches in sorted(matches_by_file.items())
+        ]
+    
+    def _search_files_python(self, directory: str, search_pattern: str, file_pattern: str) -> List[Dict]:
+        """Search by reading each file, used when ripgrep is unavailable"""
+        file_paths = [path for path, _, is_dir in self._walk(directory, file_pattern, True) if not is_dir]
+        
+        regex = self._compile_search(search_pattern)
+        first_bytes = self._first_bytes(search_pattern)
+        
+        # File reads release the GIL, so reading some files overlaps with regex scans of others
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            scanned = executor.map(lambda path: self._scan_file(path, regex, first_bytes), file_paths)
+            results = [
+                {"file": file_path, "matches": matches}
+                for file_path, matches in scanned
+                if matches is not None
+            ]
+        
+        results.sort(key=lambda result: result["file"])
+        return results
+    
+    def _compile_search(self, search_pattern: str) -> "re.Pattern[bytes]":
+        """Compile a case-insensitive literal search over UTF-8 bytes"""
+        # re.IGNORECASE only folds ASCII in bytes patterns, so spell out other case variants
+        parts = []
+        for ch in search_pattern:
+            if ch.isascii():
+                parts.append(re.escape(ch.encode('utf-8')))
+            else:
+                variants = sorted({ch, ch.lower(), ch.upper()})
+                parts.append(b"(?:" + b"|".join(re.escape(v.encode('utf-8')) for v in variants) + b")")
+        return re.compile(b"".join(parts), re.IGNORECASE)
+    
+    def _first_bytes(self, search_pattern: str) -> Tuple[bytes, ...]:
+        """Possible first bytes of a match, in every case variant of the first character"""
+        if not search_pattern:
+            return ()
+        ch = search_pattern[0]
+        return tuple({v.encode('utf-8')[:1] for v in (ch, ch.lower(), ch.upper()) if v})
+    
+    def _scan_file(self, file_path: str, regex: "re.Pattern[bytes]",
+                   first_bytes: Tuple[bytes, ...]) -> Tuple[str, Optional[List[Dict]]]:
+        """Return up to 5 matching lines of one file, or None if it does not match"""
+        try:
+            # Read rather than mmap: a file truncated while mapped (say, a log being
+            # rotated) raises SIGBUS, which kills the server instead of raising OSError
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            # Unreadable file
+            return file_path, None
+        
+        # Skip binary files
+        if data.find(b'\x00', 0, 8192) != -1:
+            return file_path, None
+        
+        # A memchr-speed scan rules out files that cannot contain a match
+        if first_bytes and all(data.find(b) == -1 for b in first_bytes):
+            return file_path, None
+        
+        matching_lines = []
+        line_number = 1
+        line_start = 0
+        pos = 0
+        while len(matching_lines) < 5:  # Limit to first 5 matches
+            match = regex.search(data, pos)
+            if not match:
+                break
+            start = data.rfind(b'\n', 0, match.start()) + 1
+            end = data.find(b'\n', match.start())
+            if end == -1:
+                end = len(data)
+            line_number += data.count(b'\n', line_start, start)
+            line_start = start
+            matching_lines.append({
+                "line_number": line_number,
+                "content": data[start:end].decode('utf-8', errors='ignore').strip()[:100]  # First 100 chars
+            })
+            if end >= len(data):
+                # Last line; an empty pattern would otherwise match it again at EOF
+                break
+            # Report each line once, however many times it matches
+            pos = end + 1
+        
+        return file_path, matching_lines or None
+    
+    def _walk(self, directory: str, pattern: str, recursive: bool) -> Iterator[Tuple[str, os.stat_result, bool]]:
+        """Yield (path, stat, is_dir) for entries matching pattern, like glob with ** when recursive"""
+        segments = _compile_pattern(pattern, recursive)
+        if recursive and segments[:1] != (GLOBSTAR,):
+            segments = (GLOBSTAR,) + segments
+        # Like glob, a trailing separator (which an empty pattern amounts to) matches
+        # directories only, and they are reported with the separator
+        dirs_only = not pattern or pattern.endswith(("/", os.sep))
+        states = self._advance(segments, {0})
+        
+        if len(segments) in states:
+            # Nothing left to match (e.g. "" or "**"): the directory itself is a match
+            try:
+                stat = os.stat(directory)
+            except OSError:
+                return
+            if S_ISDIR(stat.st_mode):
+                yield os.path.join(directory, ""), stat, True
+        
+        # Symlinked directories are only followed when no ** can recurse through them
+        follow_symlinks = GLOBSTAR not in segments
+        for path, stat, is_dir in self._walk_segments(directory, segments, states, follow_symlinks):
+            if not dirs_only:
+                yield path, stat, is_dir
+            elif is_dir:
+                yield os.path.join(path, ""), stat, True
+    
+    def _advance(self, segments: Tuple, states: Set[int]) -> Set[int]:
+        """Add the states reachable by letting a ** match zero directories"""
+        closed = set(states)
+        for i in states:
+            if i < len(segments) and segments[i] is GLOBSTAR:
+                closed.add(i + 1)
+        return closed
+    
+    def _walk_segments(self, directory: str, segments: Tuple, states: Set[int],
+                       follow_symlinks: bool) -> Iterator[Tuple[str, os.stat_result, bool]]:
+        """Match the entries of one directory against the active pattern segments"""
+        try:
+            entries = self._listdir(directory)
+        except OSError:
+            return
+        
+        end = len(segments)
+        subdirs = []
+        for name, is_dir, is_symlink in entries:
+            next_states = set()
+            for i in states:
+                if i == end:
+                    continue
+                segment = segments[i]
+                if segment is GLOBSTAR:
+                    if not name.startswith("."):
+                        next_states.add(i)
+                elif segment(name):
+                    next_states.add(i + 1)
+            if not next_states:
+                continue
+            next_states = self._advance(segments, next_states)
+            path = os.path.join(directory, name)
+            
+            if is_symlink and not self.is_safe_path(path):
+                # A link into a restricted root is neither listed nor followed
+                continue
+            
+            if end in next_states:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Dangling symlink
+                    continue
+                yield path, stat, S_ISDIR(stat.st_mode)
+            
+            # Only descend where some segment is still left to match
+            if len(next_states) > 1 or end not in next_states:
+                if is_dir or (follow_symlinks and is_symlink and os.path.isdir(path)):
+                    subdirs.append((path, next_states))
+        
+        for subdir, subdir_states in subdirs:
+            yield from self._walk_segments(subdir, segments, subdir_states, follow_symlinks)
+    
+    def _listdir(self, directory: str) -> List[Tuple[str, bool, bool]]:
+        """List (name, is_dir, is_symlink) for a directory, reusing the cached listing while its mtime is unchanged"""
+        key = os.path.abspath(directory)
+        mtime_ns = os.stat(key).st_mtime_ns
+        
+        cached = self._dir_cache.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            self._dir_cache.move_to_end(key)
+            return cached[1]
+        
+        with os.scandir(key) as it:
+            entries = [(entry.name, entry.is_dir(follow_symlinks=False), entry.is_symlink()) for entry in it]
+        
+        if time.time_ns() - mtime_ns > DIR_CACHE_MIN_AGE_NS:
+            self._dir_cache[key] = (mtime_ns, entries)
+            self._dir_cache.move_to_end(key)
+            if len(self._dir_cache) > DIR_CACHE_SIZE:
+                self._dir_cache.popitem(last=False)
+        elif cached is not None:
+            del self._dir_cache[key]
+        
+        return entries
+    
+    def _copy_file(self, source: str, destination: str) -> None:
+        """Copy a file with metadata, letting the kernel move the data where possible"""
+        if os.path.isdir(destination):
+            destination = os.path.join(destination, os.path.basename(source))
+        if os.path.exists(destination) and os.path.samefile(source, destination):
+            raise shutil.SameFileError(f"{source!r} and {destination!r} are the same file")
+        
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            if hasattr(os, "copy_file_range"):  # Linux, Python 3.8+
+                try:
+                    # Stays in the kernel, and can reflink on filesystems that support it
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), 1 << 30)
+                    if copied:
+                        while os.copy_file_range(src.fileno(), dst.fileno(), 1 << 30):
+                            pass
+                    else:
+                        # Kernels 5.3-5.18 return 0 at once for some pseudo and FUSE files whose
+                        # size reads as 0; copy those by reading, as shutil does
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                        raise
+                    # Not supported across these filesystems: finish from the current offsets
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            else:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        shutil.copystat(source, destination)
+    
+    def _hash_file(self, file_path: str) -> str:
+        """Compute a 128-bit BLAKE2b digest without loading the file into memory"""
+        with open(file_path, 'rb') as f:
+            if hasattr(hashlib, "file_digest"):  # Python 3.11+
+                return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+            h = hashlib.blake2b(digest_size=16)
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+            return h.hexdigest()
+    
     def _human_readable_size(self, size: int) -> str:
         """Convert bytes to human readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024.0:
-                return f"{size:.2f} {unit}"
-            size /= 1024.0
-        return f"{size:.2f} PB"
+        # Each unit is 10 more bits, so the unit index falls out of the bit length
+        i = 0 if size < 1024 else min(len(SIZE_UNITS) - 1, (size.bit_length() - 1) // 10)
+        return f"{size / (1 << (10 * i)):.2f} {SIZE_UNITS[i]}"
     
-    def handle_request(self, request: Dict) -> Dict:
+    async def handle_request(self, request: Dict) -> Dict:
         """Main request handler"""
-        method = request.get("method")
-        
-        handlers = {
-            "initialize": self.handle_initialize,
-            "tools/list": self.handle_list_tools,
-            "tools/call": self.handle_call_tool,
-        }
-        
-        handler = handlers.get(method)
+        return await self.dispatch(request.get("method"), request.get("id"), request.get("params") or {})
+    
+    async def dispatch(self, method: Optional[str], request_id: Any, params: Dict) -> Dict:
+        """Route a decoded request to its handler and build the response envelope"""
+        handler = self._handlers.get(method)
         if handler:
             try:
-                result = handler(request)
+                result = handler(params)
+                if inspect.isawaitable(result):
+                    result = await result
                 return {
                     "jsonrpc": "2.0",
-                    "id": request.get("id"),
+                    "id": request_id,
                     "result": result
                 }
             except Exception as e:
                 return {
                     "jsonrpc": "2.0",
-                    "id": request.get("id"),
+                    "id": request_id,
                     "error": {
                         "code": -32603,
                         "message": str(e)
@@ -686,54 +1111,102 @@ class MCPFileServer:
         else:
             return {
                 "jsonrpc": "2.0",
-                "id": request.get("id"),
+                "id": request_id,
                 "error": {
                     "code": -32601,
                     "message": f"Method not found: {method}"
                 }
             }
     
-    def run(self):
-        """Run the MCP server"""
-        while True:
-            try:
-                # Read from stdin
-                line = sys.stdin.readline()
+    async def _respond(self, method: Optional[str], request_id: Any, params: Dict) -> bytes:
+        """Handle a decoded request and return the serialized response"""
+        if method == "tools/list":
+            # Splice the tool list serialized in __init__ into the envelope
+            return b'{"jsonrpc":"2.0","id":%b,"result":%b}' % (_json_dumps(request_id), self._tools_list_json)
+        return _json_dumps(await self.dispatch(method, request_id, params))
+    
+    def _input_pending(self) -> bool:
+        """Check whether another request is already waiting on stdin"""
+        if os.name == "nt":
+            # select() only supports sockets on Windows
+            return False
+        try:
+            readable, _, _ = select.select([sys.stdin], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return bool(readable)
+    
+    async def _handle_line(self, line: bytes, out: io.BufferedWriter) -> None:
+        """Handle one request line and write its response"""
+        try:
+            # Parse JSON-RPC request
+            method, request_id, params = _decode_request(line)
+            
+            # Handle request
+            payload = await self._respond(method, request_id, params)
+            
+        except RequestInvalidError as e:
+            payload = _json_dumps({
+                "jsonrpc": "2.0",
+                "id": None,
+                "error": {
+                    "code": -32600,
+                    "message": f"Invalid Request: {str(e)}"
+                }
+            })
+        except RequestDecodeError as e:
+            payload = _json_dumps({
+                "jsonrpc": "2.0",
+                "id": None,
+                "error": {
+                    "code": -32700,
+                    "message": f"Parse error: {str(e)}"
+                }
+            })
+        except Exception as e:
+            payload = _json_dumps({
+                "jsonrpc": "2.0",
+                "id": None,
+                "error": {
+                    "code": -32603,
+                    "message": f"Internal error: {str(e)}"
+                }
+            })
+        
+        # Write response to stdout
+        out.write(payload)
+        out.write(b"\n")
+        if not self._input_pending():
+            out.flush()
+    
+    async def serve(self):
+        """Serve requests from stdin, each as its own task so slow ones don't hold up the rest"""
+        loop = asyncio.get_running_loop()
+        # Responses are buffered and flushed once no further request is waiting
+        out = open(sys.stdout.fileno(), 'wb', buffering=64 * 1024, closefd=False)
+        in_flight = set()
+        try:
+            while True:
+                if not self._input_pending():
+                    out.flush()
+                
+                # Read from stdin without blocking the event loop
+                line = await loop.run_in_executor(None, sys.stdin.buffer.readline)
                 if not line:
                     break
                 
-                # Parse JSON-RPC request
-                request = json.loads(line)
-                
-                # Handle request
-                response = self.handle_request(request)
-                
-                # Write response to stdout
-                print(json.dumps(response))
-                sys.stdout.flush()
-                
-            except json.JSONDecodeError as e:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": None,
-                    "error": {
-                        "code": -32700,
-                        "message": f"Parse error: {str(e)}"
-                    }
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
-            except Exception as e:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": None,
-                    "error": {
-                        "code": -32603,
-                        "message": f"Internal error: {str(e)}"
-                    }
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+                task = asyncio.create_task(self._handle_line(line, out))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        finally:
+            out.flush()
+    
+    def run(self):
+        """Run the MCP server"""
+        asyncio.run(self.serve())
 
 if __name__ == "__main__":
     server = MCPFileServer()
@@ -6,10 +6,92 @@ try:
     from mcp.server.fastmcp import FastMCP
 except ModuleNotFoundError:
     raise ImportError("The 'mcp' package is not installed or the import path is incorrect. Please install it with 'pip install \"mcp[cli]\"' or check the correct import path.")
-import asyncio, subprocess, sys, tempfile, textwrap, os
+import asyncio, atexit, shutil, subprocess, sys, tempfile, textwrap, os
 
 mcp = FastMCP(name="py-runner")
 
+# Interpreters kept started and idle so a call doesn't pay Python's startup time.
+# Each worker runs a single snippet and exits, so nothing leaks between calls.
+POOL_SIZE = int(os.environ.get("PY_RUNNER_POOL_SIZE", min(4, os.cpu_count() or 1)))
+
+# Worker entry point: read a length-prefixed snippet from stdin, save it as main.py
+# in the worker's temp working dir and run it as __main__ from there; whatever
+# follows the snippet on stdin is left for the snippet to read.
+WORKER_BOOTSTRAP = textwrap.dedent("""
+    def _bootstrap():
+        import os, sys, traceback
+        header = sys.stdin.buffer.readline()
+        if not header:
+            return
+        source = sys.stdin.buffer.read(int(header))
+        workdir = os.getcwd()
+        path = os.path.join(workdir, "main.py")
+        # On disk so __file__ can be read and spawn/forkserver children can re-import __main__
+        with open(path, "wb") as f:
+            f.write(source)
+        main = sys.modules["__main__"].__dict__
+        del main["_bootstrap"]
+        main["__file__"] = path
+        sys.argv = [path]
+        # Imports resolve from the temp dir, as for `python main.py`, not the server's cwd
+        sys.path[0] = workdir
+        try:
+            exec(compile(source, path, "exec"), main)
+        except SystemExit:
+            raise
+        except BaseException:
+            etype, value, tb = sys.exc_info()
+            traceback.print_exception(etype, value, tb.tb_next)
+            sys.exit(1)
+    _bootstrap()
+""")
+
+# Idle (process, temp working dir) pairs
+_idle_workers = []
+_refill_task = None
+
+async def _spawn_worker():
+    """Start a worker in a fresh temp working dir, which is removed once it exits."""
+    workdir = tempfile.mkdtemp(prefix="py-runner-")
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", WORKER_BOOTSTRAP,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=workdir,
+        )
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    return proc, workdir
+
+@atexit.register
+def _remove_idle_workdirs():
+    for _, workdir in _idle_workers:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+async def _refill_pool():
+    while len(_idle_workers) < POOL_SIZE:
+        _idle_workers.append(await _spawn_worker())
+
+async def _acquire_worker():
+    """Take a warm worker from the pool (or start one) and top the pool back up."""
+    global _refill_task
+    worker = None
+    while _idle_workers:
+        proc, workdir = _idle_workers.pop()
+        if proc.returncode is None:
+            worker = (proc, workdir)
+            break
+        shutil.rmtree(workdir, ignore_errors=True)
+    if worker is None:
+        worker = await _spawn_worker()
+
+    if _refill_task is None or _refill_task.done():
+        _refill_task = asyncio.get_running_loop().create_task(_refill_pool())
+    return worker
+
 @mcp.tool()
 async def run_python(
     code: str,
@@ -32,27 +114,22 @@ async def run_python(
     loop = asyncio.get_event_loop()
     t0 = loop.time()
 
-    with tempfile.TemporaryDirectory() as tmp:
-        src = os.path.join(tmp, "main.py")
-        with open(src, "w", encoding="utf-8") as f:
-            f.write(code)
+    proc, workdir = await _acquire_worker()
+    source = code.encode("utf-8")
+    payload = b"%d\n" % len(source) + source + (input_text.encode() if input_text else b"")
 
-        proc = await asyncio.create_subprocess_exec(
-            sys.executable, src,
-            stdin=asyncio.subprocess.PIPE if input_text else None,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=tmp,
+    try:
+        out, err = await asyncio.wait_for(
+            proc.communicate(payload),
+            timeout=timeout_secs,
         )
-
-        try:
-            out, err = await asyncio.wait_for(
-                proc.communicate(input_text.encode() if input_text else None),
-                timeout=timeout_secs,
-            )
-        except asyncio.TimeoutError:
-            proc.kill()
-            return {"error": f"Timeout after {timeout_secs}s"}
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return {"error": f"Timeout after {timeout_secs}s"}
+    finally:
+        # The worker has exited; its temp directory goes with it
+        shutil.rmtree(workdir, ignore_errors=True)
 
     return {
         "stdout": out.decode(),
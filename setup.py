@@ -8,9 +8,9 @@ setup(
     packages=find_packages(),
     py_modules=["url_scraper_mcp_fixed"],  # matches url-scraper-mcp-fixed.py
     install_requires=[
-        "mcp[cli]>=0.1.0",
-        "httpx>=0.27.0",
-        "beautifulsoup4>=4.12.0",
+        "mcp[cli]>=1.3.0",
+        "httpx[http2,brotli,zstd]>=0.27.1",
+        "selectolax>=0.3.17",
         "anyio>=4.0.0",
     ],
     entry_points={
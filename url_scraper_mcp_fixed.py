@@ -13,27 +13,214 @@ Run options:
    uv run mcp dev url-scraper-mcp-fixed.py
 
 Dependencies (add to your project):
-    pip install "mcp[cli]" httpx beautifulsoup4
+    pip install "mcp[cli]" "httpx[http2,brotli,zstd]" selectolax
 """
 
 from __future__ import annotations
 
+import codecs
+import functools
+import importlib.util
+import os
 import re
-from typing import Any, Dict, List
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin, urlsplit, urlunsplit
 
 import anyio
 import httpx
-from bs4 import BeautifulSoup
 from mcp.server.fastmcp import FastMCP
+from selectolax.lexbor import LexborHTMLParser
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Most bytes of a page that are downloaded and parsed; the rest is never read
+MAX_BYTES = int(os.environ.get("URL_SCRAPER_MAX_BYTES", 2 * 1024 * 1024))
+
+# Bytes returned as a snippet for non-HTML responses
+SNIPPET_BYTES = 512
+
+# Characters (bytes, for UTF-8 pages) parsed on the first try; each retry parses PREFIX_GROWTH times more
+PREFIX_CHARS = 64 * 1024
+PREFIX_GROWTH = 4
+
+# Most scrape_url calls fetching at once; the connection pool is sized to match
+MAX_CONCURRENCY = int(os.environ.get("URL_SCRAPER_MAX_CONCURRENCY", 32))
+_FETCH_SLOTS = anyio.Semaphore(MAX_CONCURRENCY)
+
+# Parsing holds the GIL, so more parser threads than cores only adds contention
+_PARSE_LIMITER = anyio.CapacityLimiter(os.cpu_count() or 1)
+
+# Recent results, reused for CACHE_TTL seconds (less if Cache-Control says so; never
+# stored for no-store) and then revalidated with the server's ETag/Last-Modified. Keyed by (url, max_chars, max_links, user_agent); values are
+# (etag, last_modified, expires_at, result), least recently used first
+CACHE_SIZE = 256
+CACHE_TTL = float(os.environ.get("URL_SCRAPER_CACHE_TTL", 60))
+_CACHE: "OrderedDict[Tuple[str, int, int, str], Tuple[Optional[str], Optional[str], float, Dict[str, Any]]]" = OrderedDict()
+
+# Shared across calls so repeat fetches reuse pooled (and multiplexed) connections
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            follow_redirects=True,
+            http2=_HTTP2,
+            limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=20, keepalive_expiry=30),
+            timeout=httpx.Timeout(20.0),
+        )
+    return _CLIENT
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        if _CLIENT is not None:
+            await _CLIENT.aclose()
+
 
 # Create the FastMCP server instance
-mcp = FastMCP("URL Scraper")
+mcp = FastMCP("URL Scraper", lifespan=_lifespan)
+
+
+_WS_RE = re.compile(r"\s+")
+
+# Control characters that are not whitespace are dropped outright
+_CTRL_TABLE = {c: None for c in range(32) if not chr(c).isspace()} | {127: None}
 
 
 def _clean_text(text: str) -> str:
-    # Collapse whitespace and trim
-    text = re.sub(r"\s+", " ", text or "").strip()
-    return text
+    # Drop control characters, collapse whitespace and trim
+    return _WS_RE.sub(" ", (text or "").translate(_CTRL_TABLE)).strip()
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_url(url: str) -> str:
+    # Lowercase scheme and host, and drop the fragment (it is never sent to the server)
+    parts = urlsplit(url)
+    userinfo, at, host = parts.netloc.rpartition("@")
+    return urlunsplit((parts.scheme.lower(), userinfo + at + host.lower(), parts.path, parts.query, ""))
+
+
+def _markup(body: bytes, encoding: Optional[str]) -> Union[str, bytes]:
+    # Charset from the Content-Type header, falling back to UTF-8 if missing or unknown.
+    # Lexbor reads UTF-8 bytes itself, so only other charsets are decoded here
+    try:
+        codec = codecs.lookup(encoding or "utf-8").name
+    except LookupError:
+        codec = "utf-8"
+    if codec == "utf-8":
+        return bytes(body)
+    return body.decode(codec, errors="replace")
+
+
+def _extract(html: Union[str, bytes], base_url: str, max_chars: int, max_links: int) -> Dict[str, Any]:
+    """
+    Parse an HTML page and return its title, visible text and links.
+
+    Only as much of the page as needed is parsed: a prefix is tried first and
+    widened until it yields max_chars of text and max_links links, or until the
+    whole page has been parsed.
+    """
+    limit = max(0, int(max_chars))
+    limit_links = max(0, int(max_links))
+    size = PREFIX_CHARS
+    while True:
+        partial = size < len(html)
+
+        # Lexbor parses in C and builds no Python object per node; it copes with a truncated page
+        tree = LexborHTMLParser(html[:size] if partial else html)
+
+        # Remove script/style elements
+        tree.strip_tags(["script", "style", "noscript"])
+
+        # Title
+        title_node = tree.css_first("title")
+        title = _clean_text(title_node.text() if title_node else "")
+
+        body = tree.body
+        raw_text = body.text(separator=" ") if body else ""
+        if partial:
+            # The last token of a cut page may be a broken word, entity or tag; drop it
+            cut = len(raw_text)
+            while cut and not raw_text[cut - 1].isspace():
+                cut -= 1
+            raw_text = raw_text[:cut]
+
+        # Visible text: only normalize a window a little wider than max_chars, widening it
+        # if whitespace collapse leaves too little
+        window = limit * 4
+        text_content = _clean_text(raw_text[:window])
+        while len(text_content) < limit and window < len(raw_text):
+            window *= 2
+            text_content = _clean_text(raw_text[:window])
+
+        # Links: walk the tree lazily and stop at the cap, rather than collecting every anchor first.
+        # On a cut page one extra anchor is needed to know the last one kept is complete
+        links: List[Dict[str, str]] = []
+        wanted = limit_links + 1 if partial and limit_links else limit_links
+        if wanted:
+            # Bind the per-link calls to locals; this loop can run thousands of times.
+            # Each destination is listed once (first anchor wins, fragments ignored); an href
+            # already seen is skipped before urljoin, which dominates the loop's cost
+            append, join, clean = links.append, urljoin, _clean_text
+            seen_hrefs = set()
+            seen_urls = set()
+            for node in tree.root.traverse():
+                if node.tag != "a":
+                    continue
+                href = node.attrs.get("href")
+                if not href or href in seen_hrefs:
+                    continue
+                seen_hrefs.add(href)
+                link_url = join(base_url, href)
+                target = link_url.partition("#")[0]
+                if target in seen_urls:
+                    continue
+                seen_urls.add(target)
+                append({"url": link_url, "text": clean(node.text())})
+                if len(links) >= wanted:
+                    break
+
+        if not partial or (raw_text and len(text_content) >= limit and len(links) >= wanted):
+            return {"title": title, "content": text_content[:limit], "links": links[:limit_links]}
+
+        # Widen the prefix, going straight to the whole page once a retry would cover most of it
+        size *= PREFIX_GROWTH
+        if size * PREFIX_GROWTH > len(html):
+            size = len(html)
+
+
+def _cache_lifetime(headers: httpx.Headers) -> Optional[float]:
+    # Seconds a response may be reused without asking the server, or None if it must not be stored
+    ttl = CACHE_TTL
+    for directive in headers.get("cache-control", "").lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "no-store":
+            return None
+        if name in ("no-cache", "private"):
+            # Storable, but revalidated before every reuse; private pages may differ per
+            # visitor, so a copy is never handed out without the server's say-so
+            ttl = 0
+        elif name == "max-age":
+            try:
+                ttl = min(ttl, max(0, int(value.strip().strip('"'))))
+            except ValueError:
+                # An invalid max-age counts as stale
+                ttl = 0
+    return ttl
+
+
+def _cached_copy(result: Dict[str, Any], url: str) -> Dict[str, Any]:
+    # Callers get their own dict and link list, reporting the URL they asked for
+    return dict(result, url=url, links=[dict(link) for link in result["links"]])
 
 
 @mcp.tool()
@@ -61,7 +248,7 @@ async def scrape_url(
             - status_code: HTTP status
             - title: <title> text (if any)
             - content: extracted visible text (up to max_chars)
-            - links: list of {url, text} (up to max_links)
+            - links: list of {url, text} with distinct targets (up to max_links)
     """
     if not isinstance(url, str) or not url:
         raise ValueError("url must be a non-empty string")
@@ -69,71 +256,117 @@ async def scrape_url(
     if not url.lower().startswith(("http://", "https://")):
         raise ValueError("Only http(s) URLs are supported")
 
-    headers = {"User-Agent": user_agent}
-    try:
-        async with httpx.AsyncClient(headers=headers, follow_redirects=True, timeout=timeout_s) as client:
-            resp = await client.get(url)
-    except httpx.RequestError as e:
-        # Return a structured error object instead of raising, so hosts can display it
-        return {
-            "url": url,
-            "final_url": None,
-            "status_code": None,
-            "title": None,
-            "content": "",
-            "links": [],
-            "error": f"request_error: {e.__class__.__name__}: {str(e)}",
-        }
-
-    content_type = resp.headers.get("content-type", "")
-    is_html = "html" in content_type.lower()
+    target = _normalize_url(url)
+    key = (target, max_chars, max_links, user_agent)
+    cached = _CACHE.get(key)
+    if cached is not None and cached[2] > time.monotonic():
+        _CACHE.move_to_end(key)
+        return _cached_copy(cached[3], url)
 
-    result: Dict[str, Any] = {
-        "url": url,
-        "final_url": str(resp.url),
-        "status_code": resp.status_code,
-        "title": None,
-        "content": "",
-        "links": [],
-    }
+    # Each call holds a page and its parsed tree; cap how many run at once
+    async with _FETCH_SLOTS:
+        headers = {"User-Agent": user_agent}
+        if cached is not None:
+            # Ask the server whether the cached copy is still current
+            if cached[0]:
+                headers["If-None-Match"] = cached[0]
+            if cached[1]:
+                headers["If-Modified-Since"] = cached[1]
+        try:
+            async with _get_client().stream("GET", target, headers=headers, timeout=timeout_s) as resp:
+                if resp.status_code == 304 and cached is not None:
+                    # Unchanged: skip the download and the parse, and refresh the entry's lifetime
+                    lifetime = _cache_lifetime(resp.headers)
+                    if lifetime is None:
+                        _CACHE.pop(key, None)
+                    else:
+                        _CACHE[key] = (cached[0], cached[1], time.monotonic() + lifetime, cached[3])
+                        _CACHE.move_to_end(key)
+                    return _cached_copy(cached[3], url)
 
-    if is_html and resp.text:
-        soup = BeautifulSoup(resp.text, "html.parser")
+                content_type = resp.headers.get("content-type", "")
+                is_html = "html" in content_type.lower()
 
-        # Remove script/style elements
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
+                # Refuse pages that announce more than the cap up front, without reading them
+                declared = resp.headers.get("content-length", "")
+                if is_html and declared.isdigit() and int(declared) > MAX_BYTES:
+                    return {
+                        "url": url,
+                        "final_url": str(resp.url),
+                        "status_code": resp.status_code,
+                        "title": None,
+                        "content": "",
+                        "links": [],
+                        "error": f"too_large: Content-Length {declared} exceeds {MAX_BYTES} bytes",
+                    }
 
-        # Title
-        title = soup.title.string if soup.title and soup.title.string else ""
-        result["title"] = _clean_text(title)
+                # Stop downloading once there is as much as will be used; the count is of
+                # decoded bytes, so a compressed body cannot expand past the cap either
+                limit = MAX_BYTES if is_html else SNIPPET_BYTES
+                body = bytearray()
+                async for chunk in resp.aiter_bytes(65536):
+                    body += chunk
+                    if len(body) >= limit:
+                        break
+                del body[limit:]
+        except httpx.RequestError as e:
+            # Return a structured error object instead of raising, so hosts can display it
+            return {
+                "url": url,
+                "final_url": None,
+                "status_code": None,
+                "title": None,
+                "content": "",
+                "links": [],
+                "error": f"request_error: {e.__class__.__name__}: {str(e)}",
+            }
 
-        # Visible text
-        text_content = _clean_text(soup.get_text(" "))
-        result["content"] = text_content[: max(0, int(max_chars))]
+        result: Dict[str, Any] = {
+            "url": url,
+            "final_url": str(resp.url),
+            "status_code": resp.status_code,
+            "title": None,
+            "content": "",
+            "links": [],
+        }
 
-        # Links
-        links: List[Dict[str, str]] = []
-        for a in soup.find_all("a", href=True):
-            text = _clean_text(a.get_text())
-            href = a.get("href") or ""
-            if href:
-                links.append({"url": str(httpx.URL(result["final_url"]).join(href)), "text": text})
-            if len(links) >= max(0, int(max_links)):
-                break
-        result["links"] = links
-    else:
-        # Non-HTML: just return headers and a small snippet of bytes (if present)
-        snippet = None
-        try:
-            if resp.content:
-                snippet = resp.content[:512].decode("utf-8", errors="replace")
-        except Exception:
+        if is_html and body:
+            # Parsing is CPU-bound; run it off the event loop so other requests keep flowing
+            result.update(
+                await anyio.to_thread.run_sync(
+                    _extract,
+                    _markup(body, resp.charset_encoding),
+                    result["final_url"],
+                    max_chars,
+                    max_links,
+                    limiter=_PARSE_LIMITER,
+                )
+            )
+        else:
+            # Non-HTML: just return headers and a small snippet of bytes (if present)
             snippet = None
-        result["title"] = None
-        result["content"] = snippet or ""
+            try:
+                if body:
+                    snippet = body.decode("utf-8", errors="replace")
+            except Exception:
+                snippet = None
+            result["title"] = None
+            result["content"] = snippet or ""
 
-    return result
+        lifetime = _cache_lifetime(resp.headers)
+        if resp.status_code == 200 and lifetime is not None:
+            _CACHE[key] = (
+                resp.headers.get("etag"),
+                resp.headers.get("last-modified"),
+                time.monotonic() + lifetime,
+                result,
+            )
+            _CACHE.move_to_end(key)
+            if len(_CACHE) > CACHE_SIZE:
+                _CACHE.popitem(last=False)
+            return _cached_copy(result, url)
+        _CACHE.pop(key, None)
+        return result
 
 
 async def _run_server() -> None: